@@ -0,0 +1,90 @@
+from stock.market_generator import MarketGenerator
+from stock.rolling import RollingStats
+from stock.trade_buffer import to_micros, from_micros
+from datetime import datetime, timedelta
+import time
+
+
+'''
+Streaming TWAP and price quantiles against exact computation.
+
+Trades of a single symbol are generated over 20 minutes, the streaming
+estimates over the last 15 minutes are compared with sorting / integrating
+the same trades. The sketches include the oldest bucket whole, so the rank
+error is reported both against the exact 15 minutes ("window") and against
+the bucket aligned window the sketches cover ("sketch").
+'''
+
+MINUTES = 15
+QUANTILES = (0.05, 0.5, 0.95)
+START = datetime(2024, 1, 1, 9, 0, 0)
+
+
+def exact_quantiles(prices, qs):
+    ordered = sorted(prices)
+    return [ordered[min(int(q * len(ordered)), len(ordered) - 1)] for q in qs]
+
+def exact_twap(trades, start, end):
+    area, previous = 0, None
+    for timestamp, price in trades:
+        if previous is not None:
+            t0, p0 = previous
+            lo, hi = max(t0, start), min(timestamp, end)
+            if hi > lo:
+                area += p0 * (hi - lo).total_seconds()
+        previous = (timestamp, price)
+    t0, p0 = previous
+    area += p0 * (end - max(t0, start)).total_seconds()
+    return area / (end - start).total_seconds()
+
+def bucket_start(end, window, bucket_seconds):
+    """Start of the oldest bucket RollingStats keeps for a window ending at end"""
+    oldest = (to_micros(end) / 1e6 - window) // bucket_seconds
+    return from_micros(int(oldest * bucket_seconds * 1e6))
+
+def rank_error(prices, value, q):
+    ordered = sorted(prices)
+    below = sum(1 for p in ordered if p < value)
+    upto = sum(1 for p in ordered if p <= value)
+    # distance between q and the rank interval covered by value
+    if below / len(ordered) <= q <= upto / len(ordered):
+        return 0.0
+    return min(abs(below / len(ordered) - q), abs(upto / len(ordered) - q))
+
+
+for n in (10_000, 100_000, 500_000):
+    # a walk that keeps thousands of distinct prices in the window, ties would flatter the rank error
+    generator = MarketGenerator(
+        seed=1, symbols=["ALE"], rate=n / (20 * 60), start=START, volatility=0.002, price_range=(50, 150)
+    )
+    trades = [(trade["timestamp"], trade["price"]) for _, trade in generator.trades(n)]
+    end = trades[-1][0]
+    window = [(ts, p) for ts, p in trades if ts >= end - timedelta(minutes=MINUTES)]
+    prices = [p for _, p in window]
+    print(f"n={n:>7} window={len(prices)} trades, {len(set(prices))} distinct prices")
+
+    for k in (100, 200, 400):
+        stats = RollingStats(minutes=MINUTES, buckets=MINUTES, k=k)
+        begin = time.perf_counter()
+        for timestamp, price in trades:
+            stats.add(price, timestamp)
+        update = (time.perf_counter() - begin) / n * 1e6
+
+        begin = time.perf_counter()
+        estimate = stats.quantiles(QUANTILES, now=end)
+        query = (time.perf_counter() - begin) * 1e3
+        errors = [rank_error(prices, v, q) for v, q in zip(estimate, QUANTILES)]
+        start = bucket_start(end, stats.window, stats.bucket_seconds)
+        covered = [p for ts, p in trades if ts >= start]
+        sketch_errors = [rank_error(covered, v, q) for v, q in zip(estimate, QUANTILES)]
+        twap = stats.time_weighted_price(now=end)
+        exact = exact_twap(trades, end - timedelta(minutes=MINUTES), end)
+        print(
+            f"n={n:>7} k={k:>3} update={update:.2f}us query={query:.1f}ms "
+            f"max rank error window={max(errors):.4f} sketch={max(sketch_errors):.4f} bytes={stats.nbytes()} "
+            f"twap={twap:.4f} exact={exact:.4f}"
+        )
+
+    begin = time.perf_counter()
+    exact_quantiles(prices, QUANTILES)
+    print(f"n={n:>7} exact sort of the window: {(time.perf_counter() - begin) * 1e3:.1f}ms")
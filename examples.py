@@ -1,6 +1,7 @@
 from stock.stock import Stock
 from tools.financial_metrics import GeometricMean
 from stock.cfg import stock_data
+from stock.market_generator import MarketGenerator
 import datetime, random
 from pydantic import ValidationError
 
@@ -43,19 +44,11 @@ print("Trade: ", t if t else "NA")
 # To do such a calculation and have a meaningfull result it means that 
 # come trades occured. For demostrative purposes we will have a loop that will 
 # populate the obejct with a few trades
+# MarketGenerator is seeded, so the result below is reproducible for a given start
 def trade_generator():
-    # Assume a trade per minute
-    seconds = 1800 # 30min
-    for _ in range(10000):
-        yield random.choice(['TEA', 'POP', 'ALE', 'GIN', 'JOE']), {
-            "price": random.randint(1, 250),
-            "quantity": random.randint(1, 500),
-            "timestamp": (datetime.datetime.now() - datetime.timedelta(seconds=seconds)).strftime("%Y-%m-%d %H:%M:%S"),
-            "order": random.choice(['BUY', 'SELL'])
-        }
-        seconds -= 2
-        if seconds <= 0:
-            return
+    # ~900 trades over the last 30 minutes, a trade every 2 seconds on average
+    start = datetime.datetime.now() - datetime.timedelta(minutes=30)
+    return MarketGenerator(seed=42, rate=0.5, start=start).trades(900)
 
 stock_symbol = Stock(SYMBOL)
 
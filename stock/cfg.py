@@ -1,7 +1,7 @@
 stock_data = {
-    'TEA': {'Type': 'Common', 'Last Dividend': 0, 'Par Value': 100},
-    'POP': {'Type': 'Common', 'Last Dividend': 8, 'Par Value': 100},
-    'ALE': {'Type': 'Common', 'Last Dividend': 23, 'Par Value': 60},
-    'GIN': {'Type': 'Preferred', 'Last Dividend': 8, 'Fixed Dividend': '2%', 'Par Value': 100},
-    'JOE': {'Type': 'Common', 'Last Dividend': 13, 'Par Value': 250}
+    'TEA': {'Type': 'Common', 'Last Dividend': 0, 'Par Value': 100, 'Tick Scale': 100},
+    'POP': {'Type': 'Common', 'Last Dividend': 8, 'Par Value': 100, 'Tick Scale': 100},
+    'ALE': {'Type': 'Common', 'Last Dividend': 23, 'Par Value': 60, 'Tick Scale': 100},
+    'GIN': {'Type': 'Preferred', 'Last Dividend': 8, 'Fixed Dividend': '2%', 'Par Value': 100, 'Tick Scale': 100},
+    'JOE': {'Type': 'Common', 'Last Dividend': 13, 'Par Value': 250, 'Tick Scale': 100}
 }
\ No newline at end of file
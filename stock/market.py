@@ -0,0 +1,125 @@
+from tools.metric_graph import MetricGraph
+from tools.financial_metrics import GeometricMean
+from tools._entities import Price
+from stock.stock import Stock, market_memory_usage
+from stock.retention import Retention
+from stock.cfg import stock_data
+from datetime import datetime
+from functools import partial
+
+
+'''
+A set of Stocks wired into a MetricGraph.
+
+Nodes per symbol (named "<symbol>.<node>"):
+- inputs: price, trades (a version bumped on every recorded trade), reference
+- metrics: vwap and twap (trades), dividend_yield and pe_ratio
+    (price, reference)
+and one market wide metric, gbce, the geometric mean of all known prices.
+
+A trade updates the trades and price inputs of its symbol, so it only
+recomputes that symbol's metrics and the index. Computing a metric never
+changes the stored trades: vwap covers the retained trades (running sums,
+O(1)) and TWAP depends on the clock as well, refresh() re-evaluates it.
+Price quantiles need a sketch merge, they are only computed on get().
+'''
+
+
+def _vwap(stock: Stock, trades: int):
+    return stock.get_retained_weighted_price()
+
+def _twap(stock: Stock, trades: int):
+    return stock.get_time_weighted_price()
+
+def _dividend_yield(stock: Stock, price: float | None, reference: dict):
+    return stock.get_dividend_yield(price, reference) if price is not None else None
+
+def _pe_ratio(stock: Stock, price: float | None, reference: dict):
+    return stock.get_pe_ratio(price, reference) if price is not None else None
+
+def _gbce(*prices):
+    return GeometricMean.calculate_geometric_mean_log(prices=[p for p in prices if p is not None])
+
+
+class Market:
+    def __init__(self, symbols: list[str] | None = None, retention: Retention | None = None, fixed_point: bool = False):
+        symbols = list(stock_data.keys()) if symbols is None else symbols
+        self.stocks = {symbol: Stock(symbol, retention=retention, fixed_point=fixed_point) for symbol in symbols}
+        self.graph = MetricGraph()
+        for symbol, stock in self.stocks.items():
+            self.graph.add_input(f"{symbol}.price")
+            self.graph.add_input(f"{symbol}.trades", 0)
+            self.graph.add_input(f"{symbol}.reference", stock.stock_data)
+            self.graph.add_metric(
+                f"{symbol}.vwap",
+                partial(_vwap, stock),
+                [f"{symbol}.trades"]
+            )
+            self.graph.add_metric(
+                f"{symbol}.twap",
+                partial(_twap, stock),
+                [f"{symbol}.trades"]
+            )
+            self.graph.add_metric(
+                f"{symbol}.dividend_yield",
+                partial(_dividend_yield, stock),
+                [f"{symbol}.price", f"{symbol}.reference"]
+            )
+            self.graph.add_metric(
+                f"{symbol}.pe_ratio",
+                partial(_pe_ratio, stock),
+                [f"{symbol}.price", f"{symbol}.reference"]
+            )
+        self.graph.add_metric("gbce", _gbce, [f"{symbol}.price" for symbol in self.stocks])
+
+    def stock(self, symbol: str) -> Stock:
+        try:
+            return self.stocks[symbol]
+        except KeyError:
+            raise ValueError(f"Not symbol found with name {symbol}")
+
+    def record_trade(self, symbol: str, price: float, quantity: float, timestamp: datetime, order: bool | str) -> list[str]:
+        """Records the trade, its price becomes the price of the symbol unless it is late. Returns the changed nodes"""
+        stock = self.stock(symbol)
+        latest = stock.latest_timestamp
+        trade = stock.record_trade(price=price, quantity=quantity, timestamp=timestamp, order=order)
+        updates = {f"{symbol}.trades": self.graph.get(f"{symbol}.trades") + 1}
+        if latest is None or trade.timestamp >= latest:
+            updates[f"{symbol}.price"] = trade.price
+        return self.graph.update(updates)
+
+    def set_price(self, symbol: str, price: float) -> list[str]:
+        self.stock(symbol)
+        return self.graph.set(f"{symbol}.price", Price(price=price).price)
+
+    def set_reference(self, symbol: str, reference: dict) -> list[str]:
+        """Validates the reference data, the stock only takes it once its metrics are computed"""
+        stock = self.stock(symbol)
+        changed = self.graph.set(f"{symbol}.reference", Stock.validate_reference(reference))
+        stock.stock_data = reference
+        return changed
+
+    def refresh(self) -> list[str]:
+        """Re-evaluates the clock dependent metrics (TWAP windows)"""
+        changed = []
+        for symbol in self.stocks:
+            changed += self.graph.invalidate(f"{symbol}.twap")
+        return changed
+
+    def get(self, symbol: str, metric: str):
+        if metric == "quantiles":
+            return self.quantiles(symbol)
+        return self.graph.get(f"{symbol}.{metric}")
+
+    def quantiles(self, symbol: str, quantiles=(0.05, 0.5, 0.95)) -> tuple:
+        """Price quantiles of the symbol, merged from its rolling sketches on every call"""
+        return tuple(self.stock(symbol).get_price_quantiles(quantiles))
+
+    def gbce(self) -> float | None:
+        return self.graph.get("gbce")
+
+    def subscribe(self, name: str, callback):
+        self.graph.subscribe(name, callback)
+
+    def memory_usage(self) -> int:
+        return market_memory_usage(self.stocks.values())
@@ -0,0 +1,181 @@
+from array import array
+from datetime import datetime
+from stock.cfg import stock_data
+import math
+import random
+
+
+'''
+Seeded synthetic market used to drive soak and throughput tests of Stock.
+
+Trades are drawn for every symbol of the stock_data universe (or a given
+subset) with Poisson arrivals at a configurable rate, a random walk of the
+log price per symbol (reflected at the low end of price_range) and an
+optional fraction of trades that arrive late (timestamp shifted into the
+past). The walk itself is not rounded, only the emitted prices are rounded
+to the symbol's tick ('Tick Scale'), so low prices keep moving.
+
+Two outputs are available:
+- trades(n): yields (symbol, trade dict) pairs ready for Stock.record_trade
+- fill(n) / TradeColumns: preallocated column buffers (array.array) with no
+    per-trade Python objects besides the numbers themselves
+
+Two generators created with the same arguments (including start) produce
+exactly the same sequence.
+'''
+
+
+class TradeColumns:
+    """Column buffers holding n trades, preallocated with typed arrays.
+
+    timestamps are POSIX seconds, symbols are indexes into `symbols`
+    and orders follow OrderType (1 BUY, 0 SELL).
+    """
+    def __init__(self, size: int, symbols: list[str]):
+        self.symbols = list(symbols)
+        self.symbol = array('H', bytes(2 * size))
+        self.timestamp = array('d', bytes(8 * size))
+        self.price = array('d', bytes(8 * size))
+        self.quantity = array('d', bytes(8 * size))
+        self.order = array('b', bytes(size))
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def rows(self):
+        symbols = self.symbols
+        for i in range(self.size):
+            yield symbols[self.symbol[i]], {
+                "price": self.price[i],
+                "quantity": self.quantity[i],
+                "timestamp": datetime.fromtimestamp(self.timestamp[i]),
+                "order": self.order[i],
+            }
+
+
+class MarketGenerator:
+    def __init__(
+        self,
+        seed: int = 0,
+        symbols: list[str] | None = None,
+        rate: float = 1000.0,
+        start: datetime | None = None,
+        volatility: float = 0.001,
+        out_of_order: float = 0.0,
+        max_delay: float = 1.0,
+        price_range: tuple[int, int] = (1, 250),
+        quantity_range: tuple[int, int] = (1, 500),
+    ):
+        """
+        seed: seed of the private random.Random instance
+        symbols: subset of stock_data to trade, default all of them
+        rate: mean number of trades per second over the whole market
+        start: timestamp of the first trade, default now
+        volatility: standard deviation of the log price step per trade
+        out_of_order: fraction of trades delayed by up to max_delay seconds
+        price_range: range of the initial prices, the walk is reflected at its low end
+        quantity_range: range of the quantities
+        """
+        symbols = list(stock_data.keys()) if symbols is None else list(symbols)
+        for symbol in symbols:
+            if symbol not in stock_data:
+                raise ValueError(f"Not symbol found with name {symbol}")
+        if not symbols:
+            raise ValueError("At least one symbol is required")
+        if rate <= 0:
+            raise ValueError(f"Rate must be positive number, {rate} provided instead")
+        if not 0 <= out_of_order <= 1:
+            raise ValueError(f"Out of order fraction must be within [0, 1], {out_of_order} provided instead")
+        if max_delay < 0:
+            raise ValueError(f"Max delay must be positive number, {max_delay} provided instead")
+        if volatility < 0:
+            raise ValueError(f"Volatility must be positive number, {volatility} provided instead")
+        if not 0 < price_range[0] <= price_range[1]:
+            raise ValueError(f"Price range must be positive and ordered, {price_range} provided instead")
+        if not 1 <= quantity_range[0] <= quantity_range[1]:
+            raise ValueError(f"Quantity range must start at 1 or more and be ordered, {quantity_range} provided instead")
+
+        self.symbols = symbols
+        self.rate = rate
+        self.volatility = volatility
+        self.out_of_order = out_of_order
+        self.max_delay = max_delay
+        self.quantity_range = quantity_range
+        self.price_range = price_range
+        self._random = random.Random(seed)
+        self._clock = (start or datetime.now()).timestamp()
+        self._ticks = [stock_data[symbol].get('Tick Scale', 1) for symbol in symbols]
+        # log prices of the walk, unrounded
+        self._log_prices = [
+            math.log(self._random.randint(*price_range)) for _ in symbols
+        ]
+
+    def _stream(self, n: int):
+        # Hot loop: everything is bound locally and drawn from random() directly,
+        # randint/expovariate/gauss cost several times more per call.
+        # The log price step is uniform with the same standard deviation as a
+        # gaussian step of `volatility`.
+        rnd = self._random.random
+        log, exp = math.log, math.exp
+        log_prices, ticks = self._log_prices, self._ticks
+        n_symbols = len(self.symbols)
+        inv_rate = 1.0 / self.rate
+        step = self.volatility * math.sqrt(12.0)
+        out_of_order, max_delay = self.out_of_order, self.max_delay
+        log_low = log(self.price_range[0])
+        q_low = self.quantity_range[0]
+        q_span = self.quantity_range[1] - q_low + 1
+        clock = self._clock
+        try:
+            for _ in range(n):
+                clock -= log(1.0 - rnd()) * inv_rate
+                idx = int(rnd() * n_symbols)
+                log_price = log_prices[idx] + (rnd() - 0.5) * step
+                if log_price < log_low:
+                    log_price = 2.0 * log_low - log_price
+                log_prices[idx] = log_price
+                # at least one tick, Price does not accept zero
+                tick = ticks[idx]
+                price = max(round(exp(log_price) * tick), 1) / tick
+                ts = clock
+                if out_of_order and rnd() < out_of_order:
+                    ts -= rnd() * max_delay
+                quantity = float(q_low + int(rnd() * q_span))
+                yield idx, ts, price, quantity, 1 if rnd() < 0.5 else 0
+        finally:
+            self._clock = clock
+
+    def trades(self, n: int):
+        """Yields n (symbol, trade) pairs, trade can be passed to Stock.record_trade"""
+        symbols = self.symbols
+        fromtimestamp = datetime.fromtimestamp
+        for idx, ts, price, quantity, order in self._stream(n):
+            yield symbols[idx], {
+                "price": price,
+                "quantity": quantity,
+                "timestamp": fromtimestamp(ts),
+                "order": order,
+            }
+
+    def fill(self, n: int, columns: TradeColumns | None = None) -> TradeColumns:
+        """Writes n trades into column buffers, reusing `columns` when it is large enough"""
+        if columns is None or len(columns.price) < n:
+            columns = TradeColumns(n, self.symbols)
+        else:
+            # the buffers may come from a generator with other symbols
+            columns.symbols = list(self.symbols)
+        c_symbol, c_ts = columns.symbol, columns.timestamp
+        c_price, c_qty, c_order = columns.price, columns.quantity, columns.order
+        for i, (idx, ts, price, quantity, order) in enumerate(self._stream(n)):
+            c_symbol[i] = idx
+            c_ts[i] = ts
+            c_price[i] = price
+            c_qty[i] = quantity
+            c_order[i] = order
+        columns.size = n
+        return columns
+
+    @property
+    def clock(self) -> datetime:
+        return datetime.fromtimestamp(self._clock)
@@ -0,0 +1,40 @@
+from pydantic import BaseModel, field_validator
+from datetime import timedelta
+
+
+'''
+Retention policies for the trades kept in memory by a Stock.
+
+A policy bounds the trades of a symbol by age, by count and/or by bytes.
+It is enforced every time a trade is recorded, so a symbol that is never
+queried still keeps a bounded footprint.
+
+max_bytes caps Stock.memory_usage(): the rolling stats and the dead rows
+waiting for compaction take their share first, the oldest trades are evicted
+until the rest fits.
+
+Age is measured against the newest trade timestamp seen by the stock and not
+against the wall clock, so replays of the same trades retain the same trades.
+'''
+
+
+class Retention(BaseModel):
+    max_age: timedelta | None = None
+    max_count: int | None = None
+    max_bytes: int | None = None
+
+    @field_validator('max_age', mode='after')
+    def validate_max_age(cls, value):
+        if value is not None and value <= timedelta(0):
+            raise ValueError(f"Max age must be positive, {value} provided instead")
+        return value
+
+    @field_validator('max_count', 'max_bytes', mode='after')
+    def validate_limit(cls, value):
+        if value is not None and value <= 0:
+            raise ValueError(f"Retention limits must be positive number, {value} provided instead")
+        return value
+
+    @classmethod
+    def from_minutes(cls, minutes: float, **kwargs):
+        return cls(max_age=timedelta(minutes=minutes), **kwargs)
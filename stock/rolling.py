@@ -0,0 +1,152 @@
+from tools.financial_metrics import TimeWeightedPrice, QuantileSketch
+from stock.trade_buffer import to_micros
+from datetime import datetime, timedelta
+
+
+'''
+Rolling TWAP and price quantiles over the last `minutes` of a Stock.
+
+The window is split in `buckets` time buckets, each holding a
+TimeWeightedPrice and a QuantileSketch of its trades. A trade only touches
+its own bucket, expired buckets are dropped as a whole and a query merges the
+live ones. Memory is bounded by buckets * O(k) whatever the trade rate.
+
+The window resolution is one bucket: the oldest bucket is included in the
+quantiles as a whole and prorated for TWAP, so quantiles cover between
+`minutes` and `minutes` plus one bucket (16 minutes for the default 15 / 15).
+More buckets narrow the gap at the cost of memory. For TWAP a price holds from its
+trade until the next one in time; a late trade (older than the newest one)
+is added to the quantiles but does not change the price path.
+
+merge() combines stats with the same window: quantiles over the union of the
+trades, TWAP over the price paths as a basket (see RollingStats.merge).
+'''
+
+
+def _seconds(timestamp: datetime) -> float:
+    return to_micros(timestamp) / 1e6
+
+
+class _Bucket:
+    __slots__ = ("twap", "sketch")
+
+    def __init__(self, k: int, seed: int):
+        self.twap = TimeWeightedPrice()
+        self.sketch = QuantileSketch(k=k, seed=seed)
+
+
+class RollingStats:
+    def __init__(self, minutes: float = 15, buckets: int = 15, k: int = 200):
+        if minutes <= 0 or buckets <= 0:
+            raise ValueError(f"Window and buckets must be positive, {minutes} and {buckets} provided instead")
+        self.window = timedelta(minutes=minutes).total_seconds()
+        self.bucket_seconds = self.window / buckets
+        self.k = k
+        self.buckets = {}
+        self.last_price = None
+        self.last_time = None
+        # (price, time) of the open segments of merged in price paths
+        self.held = []
+        self._oldest = None
+
+    def _bucket(self, bucket_id: int) -> _Bucket:
+        bucket = self.buckets.get(bucket_id)
+        if bucket is None:
+            bucket = self.buckets[bucket_id] = _Bucket(self.k, seed=bucket_id)
+        return bucket
+
+    def _expire(self, now: float):
+        oldest = int((now - self.window) // self.bucket_seconds)
+        # buckets only need a scan when the window moved to a new bucket
+        if oldest != self._oldest:
+            self._oldest = oldest
+            for bucket_id in [b for b in self.buckets if b < oldest]:
+                del self.buckets[bucket_id]
+
+    def _hold(self, price: float, start: float, end: float):
+        """Adds price held over [start, end) to the buckets it spans"""
+        start = max(start, end - self.window)
+        width = self.bucket_seconds
+        while start < end:
+            bucket_id = int(start // width)
+            stop = min(end, (bucket_id + 1) * width)
+            self._bucket(bucket_id).twap.add(price, stop - start)
+            start = stop
+
+    def add(self, price: float, timestamp: datetime):
+        t = _seconds(timestamp)
+        if self.last_time is None or t >= self.last_time:
+            if self.last_time is not None:
+                self._hold(self.last_price, self.last_time, t)
+            self.last_price, self.last_time = price, t
+            self._expire(t)
+        if self.last_time - t < self.window:
+            self._bucket(int(t // self.bucket_seconds)).sketch.add(price)
+
+    def merge(self, other: "RollingStats"):
+        """Merges other into these stats, bucket by bucket.
+
+        The quantiles are those of the union of the trades (e.g. shards of a
+        symbol). TWAP has basket semantics: the time of every price path adds
+        up, each path holding its last price until now, so it is the TWAP of
+        the interleaved trades only for paths over disjoint time ranges.
+        """
+        if (self.window, self.bucket_seconds, self.k) != (other.window, other.bucket_seconds, other.k):
+            raise ValueError("Only rolling stats with the same window, buckets and k can be merged")
+        for bucket_id, bucket in other.buckets.items():
+            mine = self._bucket(bucket_id)
+            mine.twap.merge(bucket.twap)
+            mine.sketch.merge(bucket.sketch)
+        opened = [(self.last_price, self.last_time)] if self.last_time is not None else []
+        if other.last_time is not None:
+            opened.append((other.last_price, other.last_time))
+        # the latest path goes on with the next trades, the others stay open
+        opened.sort(key=lambda segment: segment[1])
+        if opened:
+            self.last_price, self.last_time = opened.pop()
+        self.held += opened + other.held
+        if self.last_time is not None:
+            # merged buckets may be older than the cached oldest bucket
+            self._oldest = None
+            self._expire(self.last_time)
+
+    def time_weighted_price(self, now: datetime | None = None) -> float | None:
+        if self.last_time is None:
+            return None
+        now = _seconds(now or datetime.now())
+        start = now - self.window
+        twap = TimeWeightedPrice()
+        width = self.bucket_seconds
+        for bucket_id, bucket in self.buckets.items():
+            begin = bucket_id * width
+            if begin + width <= start or begin >= now:
+                continue
+            if begin < start:
+                # prorate the bucket cut by the start of the window
+                fraction = (begin + width - start) / width
+                twap.area += bucket.twap.area * fraction
+                twap.duration += bucket.twap.duration * fraction
+            else:
+                twap.merge(bucket.twap)
+        # the last price (of every merged path) holds until now
+        for price, time in [(self.last_price, self.last_time)] + self.held:
+            held_from = max(time, start)
+            if now > held_from:
+                twap.add(price, now - held_from)
+        return twap.current_time_weighted_price()
+
+    def sketch(self, now: datetime | None = None) -> QuantileSketch:
+        """Merged sketch of the buckets in the window ending at now"""
+        now = _seconds(now or datetime.now())
+        oldest = int((now - self.window) // self.bucket_seconds)
+        merged = QuantileSketch(k=self.k)
+        for bucket_id in sorted(self.buckets):
+            if bucket_id >= oldest:
+                merged.merge(self.buckets[bucket_id].sketch)
+        return merged
+
+    def quantiles(self, qs=(0.05, 0.5, 0.95), now: datetime | None = None) -> list[float | None]:
+        return self.sketch(now).quantiles(qs)
+
+    def nbytes(self) -> int:
+        return sum(bucket.sketch.nbytes() for bucket in self.buckets.values())
@@ -1,17 +1,35 @@
 from collections import deque
 from tools import financial_metrics
-from tools._entities import Trade
+from tools._entities import Trade, Ticks, Lots, Order, TickScale
 from stock.cfg import stock_data
+from stock.retention import Retention
+from stock.rolling import RollingStats
+from stock.trade_buffer import TradeBuffer, TradeView, Bars, ColumnView, to_micros, TRADE_BYTES, COMPACT_RATIO, MIN_COMPACT
 from datetime import datetime, timedelta
+import sys
 
 
 class Stock:
-    def __init__(self, symbol):
+    def __init__(
+            self,
+            symbol,
+            retention: Retention | None = None,
+            stats: RollingStats | None = None,
+            fixed_point: bool = False
+        ):
         self.MINUTES = 15
         self.symbol = symbol
-        self.trades = []
         self.recent_trades = deque()
         self.stock_data = self.get_symbol_info()
+        # In fixed point mode prices are integer ticks of 1 / 'Tick Scale' and quantities integer lots
+        self.scale = TickScale(tick_scale=self.stock_data.get('Tick Scale', 1)).tick_scale if fixed_point else None
+        # Trades are kept in arrival order in typed columns, evictions advance the head in O(1)
+        self.buffer = TradeBuffer(scale=self.scale)
+        self.trades = TradeView(self.buffer)
+        self.retention = retention if retention is not None else Retention.from_minutes(self.MINUTES)
+        self.latest_timestamp = None
+        # TWAP and price quantiles, updated on every trade with bounded memory
+        self.stats = stats if stats is not None else RollingStats(minutes=self.MINUTES, buckets=self.MINUTES)
     
     def get_symbol_info(self) -> dict:
         try:
@@ -19,52 +37,135 @@ class Stock:
         except KeyError:
             raise ValueError(f"Not symbol found with name {self.symbol}")
 
-    def get_dividend_yield(self, price: float) -> float | None:
-        if self.stock_data['Type'] == "Common":
+    @staticmethod
+    def validate_reference(reference: dict) -> dict:
+        """Checks that the reference data holds the keys the metrics of its Type need"""
+        required = {
+            "Common": ('Last Dividend',),
+            "Preferred": ('Last Dividend', 'Fixed Dividend', 'Par Value'),
+        }
+        if not isinstance(reference, dict) or reference.get('Type') not in required:
+            raise ValueError(f"Reference Type must be one of {list(required)}, {reference} provided instead")
+        missing = [key for key in required[reference['Type']] if key not in reference]
+        if missing:
+            raise ValueError(f"Reference is missing {missing}")
+        return reference
+
+    def get_dividend_yield(self, price: float, reference: dict | None = None) -> float | None:
+        reference = self.stock_data if reference is None else reference
+        if reference['Type'] == "Common":
             d = financial_metrics.CommonDividend.calculate_common_dividend(
                 price=price, 
-                dividend_amount=self.stock_data['Last Dividend']
+                dividend_amount=reference['Last Dividend']
                 )
             return d if d else None
 
-        if self.stock_data['Type'] == "Preferred":
+        if reference['Type'] == "Preferred":
             d = financial_metrics.PreferredDividendYield.calculate_prefered_dividend(
                 price = price,
-                dividend_pct=self.stock_data['Fixed Dividend'],
-                par_value=self.stock_data['Par Value']
+                dividend_pct=reference['Fixed Dividend'],
+                par_value=reference['Par Value']
                 )
             return d if d else None
         
-    def get_pe_ratio(self, price : float) -> float | None:
+    def get_pe_ratio(self, price : float, reference: dict | None = None) -> float | None:
+        reference = self.stock_data if reference is None else reference
         pe_ratio = financial_metrics.PERatio.calculate_pe_ratio(
             price=price,
-            dividend_amount=self.stock_data['Last Dividend']
+            dividend_amount=reference['Last Dividend']
         )
         return pe_ratio if pe_ratio else None
 
-    def record_trade(self,price :float, quantity: float, timestamp:datetime, order:bool | str):
+    def record_trade(self,price :float, quantity: float, timestamp:datetime, order:bool | str) -> Trade:
         trade = financial_metrics.Trade(
             price=price,
             quantity=quantity,
             order = order,
             timestamp=timestamp
         )
-        self.trades.append(trade)
+        self.buffer.append_trade(trade)
+        self._ingested(trade.price, trade.timestamp)
+        return trade
+
+    def record_trade_ticks(self, price_ticks: int, lots: int, timestamp: datetime, order: bool | str):
+        """Records a trade given in integer ticks and lots, only in fixed point mode"""
+        if self.scale is None:
+            raise ValueError(f"Stock {self.symbol} is not in fixed point mode")
+        price_ticks = Ticks(price_ticks=price_ticks).price_ticks
+        lots = Lots(lots=lots).lots
+        order = Order(order=order).order_type
+        if not isinstance(timestamp, datetime):
+            timestamp = Trade.parse_timestamp(timestamp)
+        self.buffer.append(to_micros(timestamp), price_ticks, lots, order)
+        self._ingested(price_ticks / self.scale, timestamp)
+
+    def _ingested(self, price: float, timestamp: datetime):
+        self.stats.add(price, timestamp)
+        if self.latest_timestamp is None or timestamp > self.latest_timestamp:
+            self.latest_timestamp = timestamp
+        self.enforce_retention()
+
+    def enforce_retention(self):
+        # Trades are checked from the oldest end only, so each one is evicted
+        # at most once and recording stays amortized O(1). A late trade older
+        # than its neighbours is evicted once it reaches the head.
+        max_age = self.retention.max_age
+        if max_age is not None and self.latest_timestamp is not None:
+            self._evict_before(self.latest_timestamp - max_age)
+        max_count = self.retention.max_count
+        if max_count is not None and len(self.buffer) > max_count:
+            self.buffer.popleft(len(self.buffer) - max_count)
+        max_bytes = self.retention.max_bytes
+        if max_bytes is not None:
+            # rows left once everything but the trade rows is paid for, dead rows awaiting
+            # compaction add up to 1 / COMPACT_RATIO of the live ones (or MIN_COMPACT)
+            rows = (max_bytes - (self.memory_usage() - self.buffer.nbytes())) // TRADE_BYTES
+            max_live = max(min(rows * COMPACT_RATIO // (COMPACT_RATIO + 1), rows - MIN_COMPACT + 1), 0)
+            if len(self.buffer) > max_live:
+                self.buffer.popleft(len(self.buffer) - max_live)
+
+    def _evict_before(self, cutoff: datetime):
+        self.buffer.evict_before(to_micros(cutoff))
+
+    def memory_usage(self) -> int:
+        """Approximate bytes held by the retained trades and rolling stats of this stock"""
+        return sys.getsizeof(self.buffer) + self.buffer.nbytes() + self.stats.nbytes()
+
+    def export_trades(self, since: datetime | None = None) -> dict[str, ColumnView]:
+        """Zero copy, read only columns (timestamp, price, quantity, order) of the retained trades from `since`"""
+        return self.buffer.arrays(since)
+
+    def build_bars(self, interval: timedelta, since: datetime | None = None) -> Bars:
+        """OHLC, volume and VWAP series of the retained trades from `since`"""
+        return self.buffer.bars(interval, since)
  
     def get_weighted_stock_price(self) -> float | None:
         current_time = datetime.now()
         recent_trades_interval = current_time - timedelta(minutes=self.MINUTES)
         
-        vwp = financial_metrics.VolWeightedPrice()
-        number_of_trades = 0
-        for record in self.trades[::-1]:
-            number_of_trades += 1
-            if record.timestamp >= recent_trades_interval:
-                vwp.add_trade(record)
-            else:
-                break
-
-        # remove every record not in 15 min from this list to offload memory
-        self.trades = self.trades[-number_of_trades:]
+        # exact integer sums in fixed point mode
+        vwp = financial_metrics.VolWeightedPrice(scale=self.scale)
+        prices, quantities = self.buffer.prices_quantities(since=recent_trades_interval)
+        with prices, quantities:
+            vwp.add_many(prices, quantities)
+
+        # trades older than the window are left to the retention policy
         result = vwp.current_vol_weighted_price()
         return result if result else None
+
+    def get_retained_weighted_price(self) -> float | None:
+        """VWAP of the retained trades, O(1) from running sums and without evicting anything"""
+        result = self.buffer.vol_weighted_price()
+        return result if result else None
+
+    def get_time_weighted_price(self) -> float | None:
+        result = self.stats.time_weighted_price()
+        return result if result else None
+
+    def get_price_quantiles(self, quantiles=(0.05, 0.5, 0.95)) -> list[float | None]:
+        return self.stats.quantiles(quantiles)
+
+
+def market_memory_usage(stocks) -> int:
+    """Approximate bytes held by the retained trades of all the given stocks"""
+    return sum(stock.memory_usage() for stock in stocks)
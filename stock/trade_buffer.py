@@ -0,0 +1,332 @@
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from tools._entities import Trade, OrderType, to_ticks
+import operator
+
+
+'''
+Columnar storage for the trades retained by a Stock.
+
+Each field lives in its own typed array.array, so a window of trades is a
+contiguous slice of every column and can be exported without copying:
+- columns(): read only memoryviews, usable by anything speaking the buffer
+    protocol (numpy.frombuffer, pyarrow.py_buffer, bytes, struct, ...)
+- arrays(): objects exposing __array_interface__ (numpy.asarray / pandas)
+- arrow(): (format, buffer) pairs laid out as Arrow primitive arrays
+    (no validity bitmap, C Data Interface format strings)
+The same exports are available on Bars, the OHLC / VWAP series of a window.
+Bars are not an export path themselves: bars() is a Python pass over every
+row of the window (~0.3s per million trades), only its result is zero copy.
+
+Timestamps are stored as int64 microseconds since 1970-01-01 of the naive
+datetime, which is exact and matches Arrow's timestamp[us].
+
+With a tick scale (fixed point mode) prices are stored as int64 ticks
+(price * scale) and quantities as int64 lots, so sums over the columns are
+exact integers. Trades and bars are converted back to prices on the way out.
+
+Evicted trades only advance a head index; the arrays are compacted once the
+dead prefix reaches a quarter of the live part, so eviction is amortized O(1)
+and the dead rows never hold more than 25% on top of the live ones.
+Running notional (price * quantity) and volume sums of the live rows give
+the VWAP of the retained trades in O(1); they are updated on append and
+eviction and recomputed at compaction, which bounds float drift.
+
+While an export is alive the arrays cannot be resized, so the next append
+copies every column (copy on write, O(rows) on the hot path) and the export
+keeps seeing its snapshot. Release exports once done.
+'''
+
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+# name, array typecode, Arrow C Data Interface format
+TRADE_COLUMNS = (
+    ("timestamp", "q", "tsu:"),
+    ("price", "d", "g"),
+    ("quantity", "d", "g"),
+    ("order", "b", "c"),
+)
+
+# Fixed point mode, price in ticks and quantity in lots
+FIXED_POINT_COLUMNS = (
+    ("timestamp", "q", "tsu:"),
+    ("price", "q", "l"),
+    ("quantity", "q", "l"),
+    ("order", "b", "c"),
+)
+
+# Bytes per retained trade (the same in both modes)
+TRADE_BYTES = sum(array(typecode).itemsize for _, typecode, _ in TRADE_COLUMNS)
+
+# Dead rows are compacted once they reach live rows / COMPACT_RATIO (and MIN_COMPACT)
+MIN_COMPACT = 16
+COMPACT_RATIO = 4
+
+
+def to_micros(timestamp: datetime) -> int:
+    return (timestamp - EPOCH) // MICROSECOND
+
+
+def from_micros(micros: int) -> datetime:
+    return EPOCH + timedelta(microseconds=micros)
+
+
+class ColumnView:
+    """Zero copy view of a column slice exposing the numpy __array_interface__.
+
+    `view` is the read only memoryview for consumers of the buffer protocol.
+    """
+    def __init__(self, view: memoryview):
+        self.view = view
+
+    def __len__(self):
+        return len(self.view)
+
+    def release(self):
+        self.view.release()
+
+    @property
+    def __array_interface__(self):
+        return {
+            "shape": (len(self.view),),
+            "typestr": "<" + {"q": "i8", "d": "f8", "b": "i1"}[self.view.format],
+            "data": self.view,
+            "version": 3,
+        }
+
+
+class ColumnStore:
+    """Typed arrays sharing a head index, rows before head are dead"""
+    COLUMNS = ()
+
+    def __init__(self):
+        self._columns = {name: array(typecode) for name, typecode, _ in self.COLUMNS}
+        self._head = 0
+
+    def __len__(self):
+        return len(next(iter(self._columns.values()))) - self._head
+
+    def window_start(self, since: datetime | None = None) -> int:
+        return 0
+
+    def columns(self, since: datetime | None = None, names=None) -> dict[str, memoryview]:
+        """Read only memoryviews of the live rows (from `since`), no data is copied"""
+        start = self._head + self.window_start(since)
+        names = self._columns.keys() if names is None else names
+        return {name: self._view(self._columns[name], start) for name in names}
+
+    @staticmethod
+    def _view(column: array, start: int) -> memoryview:
+        # only the returned slice keeps the column exported
+        with memoryview(column) as base:
+            return base[start:].toreadonly()
+
+    def arrays(self, since: datetime | None = None) -> dict[str, ColumnView]:
+        return {name: ColumnView(view) for name, view in self.columns(since).items()}
+
+    def arrow(self, since: datetime | None = None) -> dict[str, tuple[str, memoryview]]:
+        views = self.columns(since)
+        return {name: (fmt, views[name]) for name, _, fmt in self.COLUMNS}
+
+    def nbytes(self) -> int:
+        return sum(len(column) * column.itemsize for column in self._columns.values())
+
+
+class TradeBuffer(ColumnStore):
+    COLUMNS = TRADE_COLUMNS
+
+    def __init__(self, scale: int | None = None):
+        self.scale = scale
+        if scale is not None:
+            self.COLUMNS = FIXED_POINT_COLUMNS
+        super().__init__()
+        self.notional = 0
+        self.volume = 0
+
+    @property
+    def timestamps(self) -> array:
+        return self._columns["timestamp"]
+
+    @property
+    def head(self) -> int:
+        """Index of the oldest live row in the underlying arrays"""
+        return self._head
+
+    def append(self, timestamp: int, price: float, quantity: float, order: int):
+        row = (timestamp, price, quantity, order)
+        size = len(self.timestamps)
+        try:
+            try:
+                for column, value in zip(self._columns.values(), row):
+                    column.append(value)
+            except BufferError:
+                # an export holds the arrays, keep it as its own snapshot
+                self._detach()
+                for column, value in zip(self._columns.values(), row):
+                    del column[size:]
+                    column.append(value)
+        except Exception:
+            # a row is appended to every column or to none (e.g. OverflowError)
+            for column in self._columns.values():
+                if len(column) > size:
+                    del column[size:]
+            raise
+        self.notional += price * quantity
+        self.volume += quantity
+
+    def append_trade(self, trade: Trade):
+        price, quantity = trade.price, trade.quantity
+        if self.scale is not None:
+            price = to_ticks(price, self.scale)
+            quantity = to_ticks(quantity, 1, obj_name="Quantity")
+        self.append(to_micros(trade.timestamp), price, quantity, trade.order_type)
+
+    def popleft(self, n: int = 1):
+        start = self._head
+        self._head = min(start + n, len(self.timestamps))
+        if self._head >= MIN_COMPACT and self._head * COMPACT_RATIO >= len(self):
+            self._compact()
+        elif not len(self):
+            self.notional = self.volume = 0
+        else:
+            evicted = slice(start, self._head)
+            quantities = self._columns["quantity"][evicted]
+            self.notional -= sum(map(operator.mul, self._columns["price"][evicted], quantities))
+            self.volume -= sum(quantities)
+
+    def evict_before(self, cutoff: int) -> int:
+        """Evicts leading rows older than cutoff (microseconds), returns the number evicted"""
+        timestamps, start = self.timestamps, self._head
+        end = start
+        size = len(timestamps)
+        while end < size and timestamps[end] < cutoff:
+            end += 1
+        if end > start:
+            self.popleft(end - start)
+        return end - start
+
+    def _compact(self):
+        # fresh arrays of the live rows, columns that are exported keep their snapshot
+        head = self._head
+        self._columns = {name: column[head:] for name, column in self._columns.items()}
+        self._head = 0
+        self._resum()
+
+    def _resum(self):
+        c = self._columns
+        self.notional = sum(map(operator.mul, c["price"], c["quantity"]))
+        self.volume = sum(c["quantity"])
+
+    def vol_weighted_price(self) -> float | None:
+        """VWAP of the live rows from the running sums, in price units"""
+        if not self.volume:
+            return None
+        return self.notional / (self.volume * (self.scale or 1))
+
+    def _detach(self):
+        self._columns = {name: array(column.typecode, column) for name, column in self._columns.items()}
+
+    def trade(self, index: int) -> Trade:
+        """Materializes the row at index (relative to the oldest live row) as a Trade"""
+        i = self._head + index
+        c = self._columns
+        scale = self.scale or 1
+        return Trade.model_construct(
+            price=c["price"][i] / scale,
+            quantity=float(c["quantity"][i]),
+            order=OrderType(c["order"][i]),
+            timestamp=from_micros(c["timestamp"][i]),
+        )
+
+    def window_start(self, since: datetime | None = None) -> int:
+        """Relative index of the first live row at or after since (rows assumed time ordered)"""
+        if since is None:
+            return 0
+        i = bisect_left(self.timestamps, to_micros(since), lo=self._head)
+        return i - self._head
+
+    def prices_quantities(self, since: datetime | None = None) -> tuple[memoryview, memoryview]:
+        """Price and quantity views of the live rows from `since` (ticks and lots in fixed point mode)"""
+        views = self.columns(since, names=("price", "quantity"))
+        return views["price"], views["quantity"]
+
+    def bars(self, interval: timedelta, since: datetime | None = None) -> "Bars":
+        """OHLC, volume and VWAP per interval over the live rows (from `since`)"""
+        step = interval // MICROSECOND
+        if step <= 0:
+            raise ValueError(f"Interval must be positive, {interval} provided instead")
+        c = self._columns
+        timestamps, prices, quantities = c["timestamp"], c["price"], c["quantity"]
+        # bucket -> [open, high, low, close, volume, notional], late trades land in the bucket of their timestamp
+        buckets = {}
+        for i in range(self._head + self.window_start(since), len(timestamps)):
+            bucket = timestamps[i] // step
+            price, quantity = prices[i], quantities[i]
+            bar = buckets.get(bucket)
+            if bar is None:
+                buckets[bucket] = [price, price, price, price, quantity, price * quantity]
+                continue
+            if price > bar[1]:
+                bar[1] = price
+            if price < bar[2]:
+                bar[2] = price
+            bar[3] = price
+            bar[4] += quantity
+            bar[5] += price * quantity
+
+        # in fixed point mode the sums are exact integers, scaled once per bar
+        scale = self.scale or 1
+        result = Bars()
+        out = result._columns
+        for bucket in sorted(buckets):
+            o, h, l, close, volume, notional = buckets[bucket]
+            out["start"].append(bucket * step)
+            out["open"].append(o / scale)
+            out["high"].append(h / scale)
+            out["low"].append(l / scale)
+            out["close"].append(close / scale)
+            out["volume"].append(volume)
+            out["vwap"].append(notional / (volume * scale))
+        return result
+
+
+class Bars(ColumnStore):
+    COLUMNS = (
+        ("start", "q", "tsu:"),
+        ("open", "d", "g"),
+        ("high", "d", "g"),
+        ("low", "d", "g"),
+        ("close", "d", "g"),
+        ("volume", "d", "g"),
+        ("vwap", "d", "g"),
+    )
+
+
+class TradeView:
+    """Read only sequence of the live trades, Trade objects are built on access"""
+    def __init__(self, buffer: TradeBuffer):
+        self._buffer = buffer
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def __getitem__(self, index: int | slice) -> Trade | list[Trade]:
+        size = len(self._buffer)
+        if isinstance(index, slice):
+            return [self._buffer.trade(i) for i in range(*index.indices(size))]
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("trade index out of range")
+        return self._buffer.trade(index)
+
+    def __iter__(self):
+        for i in range(len(self._buffer)):
+            yield self._buffer.trade(i)
+
+    def __reversed__(self):
+        for i in range(len(self._buffer) - 1, -1, -1):
+            yield self._buffer.trade(i)
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, field_validator
 from enum import IntEnum
 from datetime import datetime
+from decimal import Decimal
 
 
 '''
@@ -31,6 +32,42 @@ def float_contraints(value, obj_name="Instance", restrict_zero=False):
             raise ValueError(f"{obj_name} cannot be zero, {value} provided instead")
     return value
 
+# Integer values are stored in int64 columns
+INT64_MAX = 2**63 - 1
+
+def int_constraints(value, obj_name="Instance", restrict_zero=False):
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"{obj_name} must be an integer value, {type(value)} provided instead")
+    if value < 0:
+        raise ValueError(f"{obj_name} must be positive number, {value} provided instead")
+    if value > INT64_MAX:
+        raise ValueError(f"{obj_name} must fit in a signed 64 bit integer, {value} provided instead")
+    if restrict_zero:
+        if value == 0:
+            raise ValueError(f"{obj_name} cannot be zero, {value} provided instead")
+    return value
+
+def to_ticks(value, scale: int, obj_name="Price") -> int:
+    """Conversion of a decimal value to integer units of 1 / scale.
+
+    Floats are allowed binary representation noise (e.g. 0.1 + 0.03),
+    anything further than 1e-6 tick from the grid is rejected, as well as
+    values whose ticks do not fit in a signed 64 bit integer.
+    """
+    if isinstance(value, float):
+        if not abs(value * scale) <= INT64_MAX:
+            raise ValueError(f"{obj_name} {value} in units of 1/{scale} must fit in a signed 64 bit integer")
+        ticks = round(value * scale)
+        if abs(value * scale - ticks) > 1e-6:
+            raise ValueError(f"{obj_name} {value} is not a multiple of 1/{scale}")
+        return ticks
+    ticks = Decimal(str(value)) * scale
+    if ticks != ticks.to_integral_value():
+        raise ValueError(f"{obj_name} {value} is not a multiple of 1/{scale}")
+    if abs(ticks) > INT64_MAX:
+        raise ValueError(f"{obj_name} {value} in units of 1/{scale} must fit in a signed 64 bit integer")
+    return int(ticks)
+
 
 class Price(BaseModel):
     price: float | None
@@ -76,6 +113,27 @@ class ParValue(BaseModel):
     def validate_par_value(cls, value):
         return float_contraints(value=value, obj_name="Par value", restrict_zero=True)
 
+class Ticks(BaseModel):
+    price_ticks: int | None
+
+    @field_validator('price_ticks', mode='after')
+    def validate_price_ticks(cls, value):
+        return int_constraints(value=value, obj_name="Price ticks", restrict_zero=True)
+
+class Lots(BaseModel):
+    lots: int | None
+
+    @field_validator('lots', mode='after')
+    def validate_lots(cls, value):
+        return int_constraints(value=value, obj_name="Lots", restrict_zero=True)
+
+class TickScale(BaseModel):
+    tick_scale: int | None = 1
+
+    @field_validator('tick_scale', mode='after')
+    def validate_tick_scale(cls, value):
+        return int_constraints(value=value, obj_name="Tick scale", restrict_zero=True)
+
 class OrderType(IntEnum):
     BUY = 1
     SELL = 0
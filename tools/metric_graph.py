@@ -0,0 +1,120 @@
+from heapq import heappush, heappop
+
+
+'''
+Dependency tracked graph of metrics.
+
+Inputs hold values set from outside (prices, trades, reference data), metrics
+are functions of other nodes. A node can only depend on nodes registered
+before it, so registration order is a topological order of the graph.
+
+On update only the nodes downstream of the changed inputs are recomputed,
+each at most once and after all of its dependencies. A metric whose value
+did not change does not dirty its own dependents. New values are only
+applied once every affected metric has been computed, so a metric that
+raises leaves the graph as it was. Subscribers of a node are called with
+(name, value) after the whole update has been applied.
+'''
+
+
+class _Node:
+    __slots__ = ("name", "order", "func", "deps", "dependents", "value", "subscribers")
+
+    def __init__(self, name, order, func=None, deps=(), value=None):
+        self.name = name
+        self.order = order
+        self.func = func
+        self.deps = deps
+        self.dependents = []
+        self.value = value
+        self.subscribers = []
+
+
+class MetricGraph:
+    def __init__(self):
+        self._nodes = {}
+        self._ordered = []
+
+    def __contains__(self, name):
+        return name in self._nodes
+
+    def _node(self, name) -> _Node:
+        try:
+            return self._nodes[name]
+        except KeyError:
+            raise ValueError(f"Not node found with name {name}")
+
+    def _add(self, node: _Node):
+        if node.name in self._nodes:
+            raise ValueError(f"Node {node.name} already exists")
+        self._nodes[node.name] = node
+        self._ordered.append(node)
+
+    def add_input(self, name: str, value=None):
+        self._add(_Node(name, len(self._nodes), value=value))
+
+    def add_metric(self, name: str, func, deps: list[str]):
+        """Registers name = func(*values of deps), computed right away"""
+        dep_nodes = tuple(self._node(dep) for dep in deps)
+        node = _Node(name, len(self._nodes), func=func, deps=dep_nodes)
+        node.value = func(*(dep.value for dep in dep_nodes))
+        self._add(node)
+        for dep in dep_nodes:
+            dep.dependents.append(node)
+
+    def get(self, name: str):
+        return self._node(name).value
+
+    def subscribe(self, name: str, callback):
+        """callback(name, value) is called every time the value of name changes"""
+        self._node(name).subscribers.append(callback)
+
+    def set(self, name: str, value) -> list[str]:
+        return self.update({name: value})
+
+    def update(self, values: dict) -> list[str]:
+        """Sets inputs and recomputes the affected metrics, returns the names of the changed nodes"""
+        nodes = [(self._node(name), value) for name, value in values.items()]
+        for node, _ in nodes:
+            if node.func is not None:
+                raise ValueError(f"Node {node.name} is a metric and cannot be set")
+        pending, dirty = {}, []
+        for node, value in nodes:
+            if pending.get(node, node.value) != value:
+                pending[node] = value
+                self._push_dependents(node, dirty)
+        return self._propagate(pending, dirty)
+
+    def invalidate(self, name: str) -> list[str]:
+        """Recomputes a metric that depends on something outside the graph (e.g. the clock)"""
+        node = self._node(name)
+        if node.func is None:
+            return []
+        dirty = [node.order]
+        return self._propagate({}, dirty)
+
+    def _push_dependents(self, node: _Node, dirty: list):
+        for dependent in node.dependents:
+            heappush(dirty, dependent.order)
+
+    def _propagate(self, pending: dict, dirty: list) -> list[str]:
+        """Computes the dirty metrics on top of the pending values, then applies them all"""
+        last = -1
+        while dirty:
+            order = heappop(dirty)
+            # a node reachable through several paths is queued several times
+            if order == last:
+                continue
+            last = order
+            node = self._ordered[order]
+            value = node.func(*(pending.get(dep, dep.value) for dep in node.deps))
+            if value != node.value:
+                pending[node] = value
+                self._push_dependents(node, dirty)
+
+        for node, value in pending.items():
+            node.value = value
+        for node in pending:
+            for callback in node.subscribers:
+                callback(node.name, node.value)
+        return [node.name for node in pending]
@@ -1,4 +1,4 @@
-from tools._entities import Price, DividendAmount, DividendPct, Quantity, ParValue, Trade, Order
+from tools._entities import Price, DividendAmount, DividendPct, Quantity, ParValue, Trade, Order, Ticks, Lots, to_ticks
 import pytest
 import datetime
 
@@ -159,3 +159,40 @@ def test_trade(price, quantity, order, timestamp):
 def test_trade_fail(price, quantity, order, timestamp):
         with pytest.raises(ValueError):
             Trade(price=price, quantity=quantity, order=order, timestamp=timestamp)
+
+### TEST TICKS AND LOTS
+@pytest.mark.parametrize("value, expected_result", [
+    (2, 2),
+    ("20", 20),
+    (3.0, 3),
+])
+def test_ticks_and_lots_success(value, expected_result):
+    assert Ticks(price_ticks=value).price_ticks == expected_result
+    assert Lots(lots=value).lots == expected_result
+    assert type(Lots(lots=value).lots) == int
+
+@pytest.mark.parametrize("value, expected_exception", [
+    (None, ValueError),
+    (2.5, ValueError),
+    (-1, ValueError),
+    (0, ValueError),
+    ("Invalid", ValueError),
+])
+def test_ticks_and_lots_exception(value, expected_exception):
+    with pytest.raises(expected_exception):
+        Ticks(price_ticks=value)
+    with pytest.raises(expected_exception):
+        Lots(lots=value)
+
+@pytest.mark.parametrize("value, scale, expected_result", [
+    (100.05, 100, 10005),
+    ("0.1", 10, 1),
+    (250, 1, 250),
+    (0.3, 10, 3),
+])
+def test_to_ticks(value, scale, expected_result):
+    assert to_ticks(value, scale) == expected_result
+
+def test_to_ticks_fail():
+    with pytest.raises(ValueError):
+        to_ticks(100.005, 100)
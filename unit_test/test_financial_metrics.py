@@ -1,4 +1,5 @@
-from tools.financial_metrics import CommonDividend, PreferredDividendYield, PERatio, GeometricMean,VolWeightedPrice
+from tools.financial_metrics import CommonDividend, PreferredDividendYield, PERatio, GeometricMean,VolWeightedPrice, TimeWeightedPrice, QuantileSketch
+import random
 import pytest
 
 
@@ -97,3 +98,87 @@ def test_volume_weigthed_average(market_value, quantity, result):
     vwp.mkt_value = market_value
     vwp.ttl_shares = quantity
     assert vwp.current_vol_weighted_price() == pytest.approx(result)
+
+@pytest.mark.parametrize("scale", [None, 100])
+def test_volume_weigthed_average_calculate(scale):
+    trades = [
+        {"price": 120, "quantity": 100, "timestamp": "2024-01-01 09:00:00", "order": "BUY"},
+        {"price": 100.05, "quantity": 100, "timestamp": "2024-01-01 09:00:01", "order": "SELL"},
+    ]
+    assert VolWeightedPrice(scale=scale).calculate(trades) == pytest.approx(110.025)
+
+def test_volume_weigthed_average_off_grid_fail():
+    trade = {"price": 100.005, "quantity": 1, "timestamp": "2024-01-01 09:00:00", "order": "BUY"}
+    with pytest.raises(ValueError):
+        VolWeightedPrice(scale=100).calculate([trade])
+
+### TEST TIME WEIGHTED PRICE
+@pytest.mark.parametrize("segments, result", [
+    ([(100, 60), (200, 30)], 133.333333),
+    ([(100, 0)], None),
+    ([], None),
+])
+def test_time_weighted_price(segments, result):
+    twap = TimeWeightedPrice()
+    for price, seconds in segments:
+        twap.add(price, seconds)
+    assert twap.current_time_weighted_price() == pytest.approx(result)
+
+def test_time_weighted_price_merge():
+    a, b = TimeWeightedPrice(), TimeWeightedPrice()
+    a.add(100, 60)
+    b.add(200, 30)
+    a.merge(b)
+    assert a.current_time_weighted_price() == pytest.approx(133.333333)
+
+### TEST QUANTILE SKETCH
+def _rank(values, value):
+    return sum(1 for v in values if v <= value) / len(values)
+
+@pytest.mark.parametrize("k, n", [
+    (100, 1000),
+    (200, 100000),
+])
+def test_quantile_sketch_accuracy(k, n):
+    rnd = random.Random(1)
+    values = [rnd.random() * 250 for _ in range(n)]
+    sketch = QuantileSketch(k=k)
+    for v in values:
+        sketch.add(v)
+    assert sketch.n == n
+    assert sketch.size < 3 * k + 64
+    ordered = sorted(values)
+    for q, value in zip((0.05, 0.5, 0.95), sketch.quantiles((0.05, 0.5, 0.95))):
+        assert abs(_rank(ordered, value) - q) < 4 / k
+    assert sketch.quantiles((0, 1)) == [ordered[0], ordered[-1]]
+
+def test_quantile_sketch_merge():
+    rnd = random.Random(2)
+    parts = [[rnd.gauss(100, 10) for _ in range(5000)] for _ in range(4)]
+    merged = QuantileSketch(k=200)
+    for part in parts:
+        sketch = QuantileSketch(k=200)
+        for v in part:
+            sketch.add(v)
+        merged.merge(sketch)
+    values = sorted(v for part in parts for v in part)
+    assert merged.n == len(values)
+    assert abs(_rank(values, merged.quantile(0.5)) - 0.5) < 0.02
+
+def test_quantile_sketch_deterministic():
+    a, b = QuantileSketch(k=50, seed=3), QuantileSketch(k=50, seed=3)
+    for i in range(10000):
+        a.add(i % 977)
+        b.add(i % 977)
+    assert a.quantiles((0.1, 0.9)) == b.quantiles((0.1, 0.9))
+
+@pytest.mark.parametrize("action", [
+    lambda: QuantileSketch(k=2),
+    lambda: QuantileSketch().quantile(1.5),
+])
+def test_quantile_sketch_fail(action):
+    with pytest.raises(ValueError):
+        action()
+
+def test_quantile_sketch_empty():
+    assert QuantileSketch().quantiles((0.5,)) == [None]
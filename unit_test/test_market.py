@@ -0,0 +1,108 @@
+from stock.market import Market
+from tools.financial_metrics import GeometricMean
+import pytest
+import datetime
+
+
+def _trade(price, quantity=100):
+    return {
+        "price": price,
+        "quantity": quantity,
+        "timestamp": datetime.datetime.now(),
+        "order": "BUY",
+    }
+
+def test_market_initial_state():
+    market = Market()
+    assert market.gbce() is None
+    assert market.get("ALE", "vwap") is None
+    assert market.get("ALE", "dividend_yield") is None
+
+def test_trade_updates_symbol_metrics_and_index():
+    market = Market()
+    changed = market.record_trade("ALE", **_trade(20))
+    assert set(changed) == {
+        "ALE.trades", "ALE.price", "ALE.vwap", "ALE.twap",
+        "ALE.dividend_yield", "ALE.pe_ratio", "gbce"
+    }
+    assert market.get("ALE", "vwap") == 20
+    assert market.get("ALE", "dividend_yield") == 1.15
+    assert market.gbce() == pytest.approx(20)
+
+    market.record_trade("POP", **_trade(100))
+    assert market.get("POP", "pe_ratio") == 12.5
+    assert market.gbce() == pytest.approx(GeometricMean.calculate_geometric_mean_log(prices=[20, 100]))
+
+def test_late_trade_does_not_move_price():
+    market = Market()
+    market.record_trade("ALE", **_trade(20))
+    late = dict(_trade(30), timestamp=datetime.datetime.now() - datetime.timedelta(minutes=1))
+    changed = market.record_trade("ALE", **late)
+    assert "ALE.price" not in changed
+    assert market.get("ALE", "price") == 20
+    assert market.get("ALE", "vwap") == 25
+
+def test_metrics_do_not_evict_trades():
+    market = Market(symbols=["ALE"])
+    old = dict(_trade(10), timestamp=datetime.datetime.now() - datetime.timedelta(hours=1))
+    market.record_trade("ALE", **old)
+    assert market.get("ALE", "vwap") == 10
+    market.refresh()
+    assert len(market.stock("ALE").trades) == 1
+
+def test_quantiles_are_computed_on_get():
+    market = Market(symbols=["ALE"])
+    for price in range(1, 101):
+        changed = market.record_trade("ALE", **_trade(price))
+        assert "ALE.quantiles" not in changed
+    p5, p50, p95 = market.get("ALE", "quantiles")
+    assert p5 <= p50 <= p95
+    assert market.quantiles("ALE", (0.0, 1.0)) == (1, 100)
+
+def test_same_price_trade_skips_price_metrics():
+    market = Market()
+    market.record_trade("ALE", **_trade(20, quantity=100))
+    changed = market.record_trade("ALE", **_trade(20, quantity=50))
+    assert "ALE.price" not in changed
+    assert "gbce" not in changed
+
+def test_set_price_and_reference():
+    market = Market(symbols=["TEA", "POP"])
+    market.set_price("POP", 100)
+    assert market.get("POP", "dividend_yield") == 0.08
+    market.set_reference("POP", {'Type': 'Common', 'Last Dividend': 10, 'Par Value': 100})
+    assert market.get("POP", "dividend_yield") == 0.1
+    assert market.get("POP", "pe_ratio") == 10
+
+def test_subscribe():
+    market = Market()
+    seen = []
+    market.subscribe("gbce", lambda name, value: seen.append(value))
+    market.set_price("GIN", 50)
+    market.set_price("GIN", 50)
+    assert seen == [pytest.approx(50)]
+
+@pytest.mark.parametrize("reference", [
+    {'Type': 'Common', 'Par Value': 100},
+    {'Type': 'Preferred', 'Last Dividend': 8, 'Par Value': 100},
+    {'Type': 'Other', 'Last Dividend': 8},
+    {'Type': 'Common', 'Last Dividend': -1},
+])
+def test_invalid_reference_is_not_applied(reference):
+    market = Market(symbols=["POP"])
+    market.set_price("POP", 100)
+    before = market.stock("POP").stock_data
+    with pytest.raises(ValueError):
+        market.set_reference("POP", reference)
+    assert market.stock("POP").stock_data is before
+    assert market.get("POP", "reference") is before
+    assert market.get("POP", "dividend_yield") == 0.08
+
+@pytest.mark.parametrize("action", [
+    lambda m: m.set_price("INVALID", 10),
+    lambda m: m.set_price("ALE", -1),
+    lambda m: m.record_trade("INVALID", **_trade(10)),
+])
+def test_market_fail(action):
+    with pytest.raises(ValueError):
+        action(Market())
@@ -0,0 +1,74 @@
+from stock.market_generator import MarketGenerator, TradeColumns
+from stock.stock import Stock
+import pytest
+import datetime
+
+
+START = datetime.datetime(2024, 1, 1, 9, 0, 0)
+
+
+def test_generator_is_deterministic():
+    a = list(MarketGenerator(seed=7, start=START, out_of_order=0.2).trades(500))
+    b = list(MarketGenerator(seed=7, start=START, out_of_order=0.2).trades(500))
+    c = list(MarketGenerator(seed=8, start=START, out_of_order=0.2).trades(500))
+    assert a == b
+    assert a != c
+
+def test_trades_and_columns_match():
+    rows = list(MarketGenerator(seed=3, start=START).trades(100))
+    columns = MarketGenerator(seed=3, start=START).fill(100)
+    assert len(columns) == 100
+    assert [symbol for symbol, _ in columns.rows()] == [symbol for symbol, _ in rows]
+    assert list(columns.price) == [trade["price"] for _, trade in rows]
+
+def test_fill_reuses_buffers():
+    gen = MarketGenerator(seed=3, start=START)
+    columns = gen.fill(100)
+    assert gen.fill(50, columns) is columns
+    assert len(columns) == 50
+    assert isinstance(gen.fill(200, columns), TradeColumns)
+
+def test_fill_reused_buffers_take_the_generator_symbols():
+    columns = MarketGenerator(seed=3, symbols=["TEA", "POP"], start=START).fill(100)
+    rows = list(MarketGenerator(seed=3, symbols=["GIN"], start=START).trades(50))
+    MarketGenerator(seed=3, symbols=["GIN"], start=START).fill(50, columns)
+    assert [symbol for symbol, _ in columns.rows()] == [symbol for symbol, _ in rows]
+
+@pytest.mark.parametrize("out_of_order, expect_late", [
+    (0.0, False),
+    (0.5, True),
+])
+def test_out_of_order(out_of_order, expect_late):
+    gen = MarketGenerator(seed=1, start=START, rate=10, out_of_order=out_of_order, max_delay=5)
+    ts = list(gen.fill(1000).timestamp)
+    late = any(b < a for a, b in zip(ts, ts[1:]))
+    assert late == expect_late
+
+@pytest.mark.parametrize("price_range", [(1, 3), (1, 250)])
+def test_low_prices_keep_moving(price_range):
+    gen = MarketGenerator(seed=2, symbols=["TEA"], start=START, price_range=price_range)
+    prices = list(gen.fill(200_000).price)
+    assert min(prices) >= 0.01
+    assert all(price == round(price, 2) for price in prices[:1000])
+    assert len(set(prices[-10_000:])) > 10
+
+def test_generated_trades_are_valid_for_stock():
+    stocks = {}
+    for symbol, trade in MarketGenerator(seed=5, start=START, price_range=(1, 2)).trades(1000):
+        stocks.setdefault(symbol, Stock(symbol, fixed_point=True)).record_trade(**trade)
+    assert sum(len(s.trades) for s in stocks.values()) == 1000
+
+@pytest.mark.parametrize("kwargs", [
+    {"symbols": ["INVALID"]},
+    {"symbols": []},
+    {"rate": 0},
+    {"out_of_order": 1.5},
+    {"max_delay": -1},
+    {"volatility": -0.1},
+    {"price_range": (0, 10)},
+    {"price_range": (10, 1)},
+    {"quantity_range": (0, 10)},
+])
+def test_generator_fail(kwargs):
+    with pytest.raises(ValueError):
+        MarketGenerator(**kwargs)
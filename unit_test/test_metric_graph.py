@@ -0,0 +1,82 @@
+from tools.metric_graph import MetricGraph
+import pytest
+
+
+@pytest.fixture(scope='function')
+def graph():
+    calls = []
+    g = MetricGraph()
+    g.add_input("a", 1)
+    g.add_input("b", 2)
+    g.add_input("c", 3)
+
+    def track(name, func):
+        def wrapper(*args):
+            calls.append(name)
+            return func(*args)
+        return wrapper
+
+    g.add_metric("sum_ab", track("sum_ab", lambda a, b: a + b), ["a", "b"])
+    g.add_metric("double_c", track("double_c", lambda c: c * 2), ["c"])
+    g.add_metric("parity_ab", track("parity_ab", lambda s: s % 2), ["sum_ab"])
+    g.add_metric("total", track("total", lambda s, d, p: s + d + p), ["sum_ab", "double_c", "parity_ab"])
+    calls.clear()
+    g.calls = calls
+    return g
+
+
+def test_initial_values(graph):
+    assert graph.get("sum_ab") == 3
+    assert graph.get("total") == 3 + 6 + 1
+
+def test_only_affected_nodes_recompute(graph):
+    changed = graph.set("c", 4)
+    assert graph.calls == ["double_c", "total"]
+    assert changed == ["c", "double_c", "total"]
+    assert graph.get("total") == 3 + 8 + 1
+
+def test_each_node_recomputes_once(graph):
+    graph.update({"a": 2, "b": 3})
+    assert graph.calls == ["sum_ab", "parity_ab", "total"]
+    assert graph.get("total") == 5 + 6 + 1
+
+def test_unchanged_metric_stops_propagation(graph):
+    graph.update({"a": 2, "b": 1})
+    assert graph.calls == ["sum_ab"]
+    assert graph.set("a", 2) == []
+
+def test_subscribers(graph):
+    seen = []
+    graph.subscribe("total", lambda name, value: seen.append((name, value)))
+    graph.subscribe("parity_ab", lambda name, value: seen.append((name, value)))
+    graph.update({"a": 2, "c": 4})
+    assert seen == [("parity_ab", 0), ("total", 4 + 8 + 0)]
+    seen.clear()
+    graph.set("c", 3)
+    # total stays at 10 (4 + 6 + 0 == 3 + 6 + 1) so it is not notified again
+    graph.set("a", 1)
+    assert seen == [("total", 4 + 6 + 0), ("parity_ab", 1)]
+
+def test_failed_update_is_not_applied(graph):
+    graph.add_metric("ratio", lambda a, b: a / b, ["a", "b"])
+    seen = []
+    graph.subscribe("a", lambda name, value: seen.append(value))
+    with pytest.raises(ZeroDivisionError):
+        graph.update({"a": 5, "b": 0})
+    assert (graph.get("a"), graph.get("b")) == (1, 2)
+    assert (graph.get("sum_ab"), graph.get("ratio"), graph.get("total")) == (3, 0.5, 10)
+    assert seen == []
+
+def test_invalidate(graph):
+    graph.invalidate("double_c")
+    assert graph.calls == ["double_c"]
+
+@pytest.mark.parametrize("action", [
+    lambda g: g.set("missing", 1),
+    lambda g: g.set("total", 1),
+    lambda g: g.add_input("a"),
+    lambda g: g.add_metric("x", lambda v: v, ["missing"]),
+])
+def test_graph_fail(graph, action):
+    with pytest.raises(ValueError):
+        action(graph)
@@ -0,0 +1,103 @@
+from stock.rolling import RollingStats
+from stock.stock import Stock
+import pytest
+import datetime
+
+
+START = datetime.datetime(2024, 1, 1, 9, 0, 0)
+
+
+def _at(seconds):
+    return START + datetime.timedelta(seconds=seconds)
+
+
+def test_time_weighted_price():
+    stats = RollingStats(minutes=15, buckets=15)
+    stats.add(100, _at(0))
+    stats.add(200, _at(600))
+    # 100 for 10 minutes, 200 for 5 minutes
+    assert stats.time_weighted_price(now=_at(900)) == pytest.approx((100 * 600 + 200 * 300) / 900)
+    # the window moved by 5 minutes, 100 only held for 5 of them
+    assert stats.time_weighted_price(now=_at(1200)) == pytest.approx((100 * 300 + 200 * 600) / 900)
+    assert stats.time_weighted_price(now=_at(10000)) == pytest.approx(200)
+
+def test_late_trade_does_not_change_price_path():
+    stats = RollingStats()
+    stats.add(100, _at(0))
+    stats.add(200, _at(600))
+    stats.add(1000, _at(300))
+    assert stats.time_weighted_price(now=_at(900)) == pytest.approx((100 * 600 + 200 * 300) / 900)
+    assert stats.quantiles((1,), now=_at(900)) == [1000]
+
+def test_quantiles_window_and_memory():
+    stats = RollingStats(minutes=15, buckets=15, k=100)
+    for i in range(3600 * 10):
+        stats.add(float(i % 1000), _at(i * 0.1))
+    assert len(stats.buckets) <= 16
+    p5, p50, p95 = stats.quantiles(now=_at(3600))
+    assert p5 == pytest.approx(50, abs=25)
+    assert p50 == pytest.approx(500, abs=25)
+    assert p95 == pytest.approx(950, abs=25)
+
+def test_old_trades_leave_the_window():
+    stats = RollingStats(minutes=15, buckets=15)
+    stats.add(100, _at(0))
+    stats.add(200, _at(3600))
+    assert stats.quantiles((0, 1), now=_at(3600)) == [200, 200]
+
+def test_merge():
+    a, b, both = RollingStats(), RollingStats(), RollingStats()
+    for i in range(600):
+        price = float(i % 100)
+        (a if i % 2 else b).add(price, _at(i))
+        both.add(price, _at(i))
+    b.add(500, _at(900))
+    both.add(500, _at(900))
+    # basket TWAP: a holds prices over [1, 900), b over [0, 900)
+    basket = (a.time_weighted_price(now=_at(900)) * 899 + b.time_weighted_price(now=_at(900)) * 900) / 1799
+    a.merge(b)
+    assert a.last_price == 500
+    assert a.time_weighted_price(now=_at(900)) == pytest.approx(basket)
+    assert a.quantiles((0, 1), now=_at(900)) == [0, 500]
+    assert a.sketch(now=_at(900)).n == both.sketch(now=_at(900)).n
+    assert a.quantiles(now=_at(900)) == pytest.approx(both.quantiles(now=_at(900)), abs=2)
+
+def test_merge_time_weighted_price_is_a_basket():
+    a, b = RollingStats(), RollingStats()
+    a.add(100, _at(0))
+    b.add(200, _at(300))
+    b.add(300, _at(600))
+    a.merge(b)
+    # 100 held over [0, 900), 200 over [300, 600) and 300 over [600, 900)
+    assert a.time_weighted_price(now=_at(900)) == pytest.approx((100 * 900 + 200 * 300 + 300 * 300) / 1500)
+    a.add(400, _at(900))
+    assert a.last_price == 400
+    # the latest path (b) went on with 400, the one of a still holds 100
+    assert a.time_weighted_price(now=_at(1200)) == pytest.approx(
+        (100 * 900 + 200 * 300 + 300 * 300 + 400 * 300) / 1800
+    )
+
+def test_merge_expires_old_buckets():
+    recent, old = RollingStats(), RollingStats()
+    recent.add(100, _at(3600))
+    old.add(200, _at(0))
+    recent.merge(old)
+    assert len(recent.buckets) == 1
+    assert recent.quantiles((0, 1), now=_at(3600)) == [100, 100]
+
+def test_merge_fail():
+    with pytest.raises(ValueError):
+        RollingStats(buckets=15).merge(RollingStats(buckets=30))
+
+def test_rolling_fail():
+    with pytest.raises(ValueError):
+        RollingStats(minutes=0)
+
+def test_stock_rolling_stats():
+    s = Stock(symbol="ALE")
+    now = datetime.datetime.now()
+    for i, price in enumerate([100, 110, 120]):
+        s.record_trade(price=price, quantity=10, timestamp=now - datetime.timedelta(seconds=30 - i * 10), order="BUY")
+    twap = s.get_time_weighted_price()
+    assert 100 < twap <= 120
+    assert s.get_price_quantiles((0, 0.5, 1)) == [100, 110, 120]
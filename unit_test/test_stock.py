@@ -1,4 +1,5 @@
-from stock.stock import Stock
+from stock.stock import Stock, market_memory_usage
+from stock.retention import Retention
 from tools._entities import Trade
 import pytest
 import datetime
@@ -103,3 +104,123 @@ def test_vol_weight_stock_price_fail():
         assert result == 160 #  ( (120 * 100) + (200 * 100) ) / (100 + 100)
 
 
+
+# RETENTION
+def _trade(seconds):
+    return {
+        "price": 100,
+        "quantity": 10,
+        "timestamp": datetime.datetime(2024, 1, 1) + datetime.timedelta(seconds=seconds),
+        "order": 1,
+    }
+
+def test_default_retention_evicts_on_ingest():
+    s = Stock(symbol="ALE")
+    for seconds in range(0, 3600, 60):
+        s.record_trade(**_trade(seconds))
+    # trades older than MINUTES from the newest one are dropped without querying
+    assert len(s.trades) == s.MINUTES + 1
+    assert s.trades[0].timestamp == datetime.datetime(2024, 1, 1, 0, 44)
+
+def test_vwap_query_keeps_retained_trades():
+    s = Stock(symbol="ALE", retention=Retention.from_minutes(60))
+    now = datetime.datetime.now()
+    for minutes in range(60):
+        s.record_trade(price=100 + minutes, quantity=1, timestamp=now - datetime.timedelta(minutes=59 - minutes, seconds=30), order="BUY")
+    # only the last 15 minutes are weighted, the retained hour stays
+    assert s.get_weighted_stock_price() == pytest.approx(sum(range(145, 160)) / 15)
+    assert len(s.trades) == 60
+    assert len(s.export_trades()["price"]) == 60
+
+@pytest.mark.parametrize("retention, expected_count", [
+    (Retention(max_count=10), 10),
+    (Retention.from_minutes(1), 61),
+    (Retention(), 1000),
+])
+def test_retention_limits(retention, expected_count):
+    s = Stock(symbol="ALE", retention=retention)
+    for seconds in range(1000):
+        s.record_trade(**_trade(seconds))
+    assert len(s.trades) == expected_count
+    assert s.trades[-1].timestamp == datetime.datetime(2024, 1, 1) + datetime.timedelta(seconds=999)
+
+@pytest.mark.parametrize("max_bytes", [100_000, 300_000])
+def test_retention_max_bytes_caps_memory_usage(max_bytes):
+    s = Stock(symbol="ALE", retention=Retention(max_bytes=max_bytes))
+    for seconds in range(20000):
+        s.record_trade(**_trade(seconds * 0.01))
+        assert s.memory_usage() <= max_bytes
+    assert len(s.trades) > 0
+    assert s.trades[-1].timestamp == datetime.datetime(2024, 1, 1) + datetime.timedelta(seconds=199.99)
+    # the budget is used, not just respected
+    assert s.memory_usage() > max_bytes * 0.7
+
+@pytest.mark.parametrize("kwargs", [
+    {"max_count": 0},
+    {"max_bytes": -1},
+    {"max_age": datetime.timedelta(0)},
+])
+def test_retention_fail(kwargs):
+    with pytest.raises(ValueError):
+        Retention(**kwargs)
+
+def test_memory_usage():
+    stocks = [Stock(symbol="ALE", retention=Retention(max_count=100)), Stock(symbol="POP")]
+    empty = market_memory_usage(stocks)
+    for seconds in range(500):
+        stocks[0].record_trade(**_trade(seconds))
+        stocks[1].record_trade(**_trade(seconds))
+    assert len(stocks[0].trades) == 100
+    assert stocks[0].memory_usage() < stocks[1].memory_usage()
+    assert market_memory_usage(stocks) == stocks[0].memory_usage() + stocks[1].memory_usage()
+    assert market_memory_usage(stocks) > empty
+
+# FIXED POINT
+def test_fixed_point_vwap_is_exact():
+    now = datetime.datetime.now()
+    fixed, floating = Stock(symbol="ALE", fixed_point=True), Stock(symbol="ALE")
+    for i in range(1000):
+        trade = {"price": 0.1 + (i % 7) * 0.01, "quantity": 3, "timestamp": now, "order": "BUY"}
+        fixed.record_trade(**trade)
+        floating.record_trade(**trade)
+    # sum of ticks is exact: the only rounding is the final division
+    ticks = sum(10 + (i % 7) for i in range(1000))
+    assert fixed.get_weighted_stock_price() == ticks * 3 / (3000 * 100)
+    assert floating.get_weighted_stock_price() == pytest.approx(fixed.get_weighted_stock_price())
+    assert fixed.trades[-1].price == 0.15
+    assert fixed.buffer.columns()["price"].format == "q"
+
+def test_record_trade_ticks():
+    s = Stock(symbol="GIN", fixed_point=True)
+    now = datetime.datetime.now()
+    s.record_trade_ticks(price_ticks=12000, lots=100, timestamp=now, order="BUY")
+    s.record_trade(price=200, quantity=100, timestamp=now, order="SELL")
+    assert s.scale == 100
+    assert s.get_weighted_stock_price() == 160
+    assert s.trades[0].price == 120.0
+
+@pytest.mark.parametrize("fixed_point, kwargs", [
+    (False, {"price_ticks": 100, "lots": 1}),
+    (True, {"price_ticks": 1.5, "lots": 1}),
+    (True, {"price_ticks": 100, "lots": 0}),
+    (True, {"price_ticks": 2**63, "lots": 1}),
+    (True, {"price_ticks": 100, "lots": 2**63}),
+])
+def test_record_trade_ticks_fail(fixed_point, kwargs):
+    s = Stock(symbol="ALE", fixed_point=fixed_point)
+    with pytest.raises(ValueError):
+        s.record_trade_ticks(timestamp=datetime.datetime.now(), order="BUY", **kwargs)
+    assert len(s.trades) == 0
+    assert len({len(column) for column in s.buffer.columns().values()}) == 1
+
+@pytest.mark.parametrize("price, quantity", [
+    (100.005, 1),
+    (100, 1.5),
+    (1e17, 1),
+    (100, 2.0**63),
+])
+def test_fixed_point_off_grid_fail(price, quantity):
+    s = Stock(symbol="ALE", fixed_point=True)
+    with pytest.raises(ValueError):
+        s.record_trade(price=price, quantity=quantity, timestamp=datetime.datetime.now(), order="BUY")
+    assert len(s.trades) == 0
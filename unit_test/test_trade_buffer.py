@@ -0,0 +1,175 @@
+from stock.trade_buffer import TradeBuffer, TradeView, Bars, to_micros, from_micros, MIN_COMPACT, COMPACT_RATIO, TRADE_BYTES
+from stock.stock import Stock
+from stock.retention import Retention
+import pytest
+import datetime
+
+
+START = datetime.datetime(2024, 1, 1, 9, 0, 0)
+
+
+def _buffer(n, step=datetime.timedelta(seconds=1)):
+    buffer = TradeBuffer()
+    for i in range(n):
+        buffer.append(to_micros(START + i * step), 100.0 + i, 10.0, i % 2)
+    return buffer
+
+
+@pytest.mark.parametrize("timestamp", [
+    START,
+    datetime.datetime(2024, 1, 1, 9, 0, 0, 123456),
+    datetime.datetime(1969, 12, 31, 23, 59, 59, 999999),
+])
+def test_micros_roundtrip(timestamp):
+    assert from_micros(to_micros(timestamp)) == timestamp
+
+def test_trade_view():
+    view = TradeView(_buffer(3))
+    assert len(view) == 3
+    assert view[0].timestamp == START
+    assert view[-1].price == 102.0
+    assert view[1].trade["order"] == "BUY"
+    assert [t.price for t in reversed(view)] == [102.0, 101.0, 100.0]
+    with pytest.raises(IndexError):
+        view[3]
+
+@pytest.mark.parametrize("index", [
+    slice(-2, None),
+    slice(None, 2),
+    slice(None, None, -1),
+    slice(1, 10, 2),
+    slice(5, 1),
+])
+def test_trade_view_slices(index):
+    view = TradeView(_buffer(5))
+    assert [t.price for t in view[index]] == [100.0 + i for i in range(5)][index]
+
+def test_columns_are_zero_copy():
+    buffer = _buffer(10)
+    columns = buffer.columns(since=START + datetime.timedelta(seconds=4))
+    assert columns["price"].obj is buffer._columns["price"]
+    assert columns["price"].readonly
+    assert columns["price"].tolist() == [104.0 + i for i in range(6)]
+    assert columns["timestamp"][0] == to_micros(START + datetime.timedelta(seconds=4))
+
+def test_export_survives_appends_and_evictions():
+    buffer = _buffer(10)
+    snapshot = buffer.columns()["price"]
+    for i in range(MIN_COMPACT * 2):
+        buffer.append(to_micros(START), 1.0, 1.0, 1)
+    buffer.popleft(MIN_COMPACT * 2)
+    assert snapshot.tolist() == [100.0 + i for i in range(10)]
+    assert len(buffer) == 10
+
+def test_partial_export_survives_compaction():
+    buffer = _buffer(100)
+    columns = buffer.arrays()
+    columns["timestamp"].release()
+    # eviction only, the compaction finds the price column exported
+    buffer.popleft(50)
+    assert buffer.head == 0
+    assert [len(column) for column in buffer._columns.values()] == [50, 50, 50, 50]
+    trade = TradeView(buffer)[0]
+    assert (trade.timestamp, trade.price) == (START + datetime.timedelta(seconds=50), 150.0)
+    assert columns["price"].view[0] == 100.0
+
+@pytest.mark.parametrize("live", [10, 100, 10000])
+def test_dead_rows_are_compacted(live):
+    buffer = TradeBuffer()
+    for i in range(live * 10):
+        buffer.append(to_micros(START), 1.0, 1.0, 1)
+        if len(buffer) > live:
+            buffer.popleft()
+    assert len(buffer) == live
+    assert buffer.nbytes() <= (live + max(MIN_COMPACT, live // COMPACT_RATIO)) * TRADE_BYTES
+
+@pytest.mark.parametrize("scale", [None, 100])
+def test_running_vwap_matches_window(scale):
+    buffer = TradeBuffer(scale=scale)
+    for i in range(1000):
+        buffer.append(to_micros(START), 100 + i % 7, 1 + i % 3, 1)
+        if len(buffer) > 100:
+            buffer.popleft(1 + i % 2)
+    prices, quantities = buffer.prices_quantities()
+    with prices, quantities:
+        expected = sum(p * q for p, q in zip(prices, quantities)) / (sum(quantities) * (scale or 1))
+    assert buffer.vol_weighted_price() == pytest.approx(expected)
+    buffer.popleft(len(buffer))
+    assert buffer.vol_weighted_price() is None
+
+def test_array_interface_and_arrow():
+    buffer = _buffer(5)
+    arrays = buffer.arrays()
+    interface = arrays["timestamp"].__array_interface__
+    assert interface["shape"] == (5,)
+    assert interface["typestr"] == "<i8"
+    assert arrays["order"].__array_interface__["typestr"] == "<i1"
+    arrow = buffer.arrow()
+    assert [fmt for fmt, _ in arrow.values()] == ["tsu:", "g", "g", "c"]
+    assert arrow["quantity"][1].nbytes == 5 * 8
+    for column in arrays.values():
+        column.release()
+    for _, view in arrow.values():
+        view.release()
+    # nothing holds the columns anymore, appending does not copy them
+    columns = buffer._columns
+    buffer.append(to_micros(START), 1.0, 1.0, 1)
+    assert buffer._columns is columns
+
+def test_prices_quantities_only_exports_what_it_returns():
+    buffer = _buffer(5)
+    prices, quantities = buffer.prices_quantities()
+    with prices, quantities:
+        assert list(prices) == [100.0, 101.0, 102.0, 103.0, 104.0]
+    columns = buffer._columns
+    buffer.append(to_micros(START), 1.0, 1.0, 1)
+    assert buffer._columns is columns
+
+def test_bars():
+    bars = _buffer(180).bars(datetime.timedelta(minutes=1))
+    assert isinstance(bars, Bars)
+    assert len(bars) == 3
+    columns = bars.columns()
+    assert from_micros(columns["start"][1]) == START + datetime.timedelta(minutes=1)
+    assert columns["open"][0] == 100.0
+    assert columns["high"][0] == 159.0
+    assert columns["close"][2] == 279.0
+    assert columns["volume"][0] == 600.0
+    assert columns["vwap"][0] == pytest.approx(129.5)
+
+def test_bars_fail():
+    with pytest.raises(ValueError):
+        _buffer(1).bars(datetime.timedelta(0))
+
+def test_stock_export():
+    s = Stock(symbol="ALE", retention=Retention(max_count=100))
+    for i in range(300):
+        s.record_trade(price=100 + i, quantity=1, timestamp=START + datetime.timedelta(seconds=i), order="BUY")
+    columns = s.export_trades()
+    assert len(columns["price"]) == 100
+    assert columns["price"].view[0] == 300.0
+    bars = s.build_bars(datetime.timedelta(seconds=10))
+    assert len(bars) == 10
+
+@pytest.mark.parametrize("exported", [False, True])
+def test_failed_append_keeps_columns_aligned(exported):
+    buffer = TradeBuffer(scale=100)
+    buffer.append(to_micros(START), 10000, 10, 1)
+    views = buffer.columns() if exported else {}
+    with pytest.raises(OverflowError):
+        buffer.append(to_micros(START), 2**63, 10, 1)
+    assert [len(column) for column in buffer._columns.values()] == [1, 1, 1, 1]
+    assert buffer.vol_weighted_price() == 100.0
+    for view in views.values():
+        view.release()
+
+def test_fixed_point_buffer():
+    buffer = TradeBuffer(scale=100)
+    for i in range(120):
+        buffer.append(to_micros(START + datetime.timedelta(seconds=i)), 10000 + i, 10, 1)
+    assert [fmt for fmt, _ in buffer.arrow().values()] == ["tsu:", "l", "l", "c"]
+    assert buffer.arrays()["price"].__array_interface__["typestr"] == "<i8"
+    assert TradeView(buffer)[1].price == 100.01
+    bars = buffer.bars(datetime.timedelta(minutes=1)).columns()
+    assert bars["open"][1] == 100.6
+    assert bars["vwap"][0] == sum(10000 + i for i in range(60)) / (60 * 100)